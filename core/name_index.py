@@ -0,0 +1,91 @@
+import bisect
+import logging
+import threading
+from typing import Dict, List, Protocol, Tuple
+
+log = logging.getLogger(__name__)
+
+SUGGEST_LIMIT = 6
+
+class INameBalanceSource(Protocol):
+    def name_balances(self) -> Tuple[int, List[Tuple[str, int]]]:
+        """Връща (max_id, [(име, сума_в_стотинки), ...]) от една снимка на БД."""
+        ...
+
+class NamePrefixIndex:
+    """
+    In-memory префиксен индекс на различните имена -> текущ баланс (стотинки).
+    Сортиран масив от (ключ_casefold, име) + bisect: търсене O(log n + k).
+    Зарежда се веднъж във фонов thread, после се допълва от хранилището при всеки запис.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: List[Tuple[str, str]] = []   # сортирани (name.casefold(), name)
+        self._balance: Dict[str, int] = {}
+        self._loading = False
+        self._pending: List[Tuple[int, str, int]] = []  # (id, name, amount_st) по време на зареждане
+        self._max_id = 0   # последният id, включен в заредената снимка
+        self.ready = False
+
+    def load(self, repo: INameBalanceSource) -> bool:
+        """
+        Пълно зареждане (вика се извън UI thread-а). Връща True при успех.
+        При грешка (напр. заключена БД) индексът остава неготов – подсказките
+        са изключени, вместо да показват непълни баланси; load() може да се извика пак.
+        """
+        with self._lock:
+            self._loading = True
+            self._pending = []
+        try:
+            max_id, sums = repo.name_balances()
+            balance = dict(sums)
+            keys = sorted((n.casefold(), n) for n in balance)
+        except Exception:
+            log.exception("NamePrefixIndex: зареждането на имената се провали")
+            with self._lock:
+                self._loading = False
+                self._pending = []   # без снимка няма спрямо какво да ги приложим
+            return False
+        with self._lock:
+            self._balance = balance
+            self._keys = keys
+            self._max_id = max_id
+            self._loading = False
+            # Записи, направени докато сме чели – минават през същата проверка срещу снимката.
+            for row_id, name, amount_st in self._pending:
+                self._add_locked(row_id, name, amount_st)
+            self._pending = []
+            self.ready = True
+        return True
+
+    def add(self, row_id: int, name: str, amount_st: int):
+        with self._lock:
+            if self._loading:
+                self._pending.append((row_id, name, amount_st))
+                return
+            self._add_locked(row_id, name, amount_st)
+
+    def _add_locked(self, row_id: int, name: str, amount_st: int):
+        # редът може да е записан преди снимката, а add() да идва след load() – вече е преброен
+        if row_id <= self._max_id:
+            return
+        if name not in self._balance:
+            self._balance[name] = 0
+            bisect.insort(self._keys, (name.casefold(), name))
+        self._balance[name] += amount_st
+
+    def suggest(self, prefix: str, limit: int = SUGGEST_LIMIT) -> List[Tuple[str, int]]:
+        """Връща до limit двойки (име, баланс) за имена, започващи с prefix (без значение от регистъра)."""
+        key = (prefix or "").lstrip().casefold()  # интервалът в края е част от префикса ("Иван " ≠ "Иванка")
+        if not key:
+            return []
+        out = []
+        with self._lock:
+            i = bisect.bisect_left(self._keys, (key,))
+            while i < len(self._keys) and len(out) < limit:
+                k, name = self._keys[i]
+                if not k.startswith(key):
+                    break
+                out.append((name, self._balance[name]))
+                i += 1
+        return out
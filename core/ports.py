@@ -15,3 +15,5 @@ class IRepository(Protocol):
     def search_by_name(self, q: str) -> List[Tuple[str, int]]: ...
     def list_entries(self, name: str) -> List[Tuple[str, int, Optional[int]]]: ...
     def sum_for_name(self, name: str) -> int: ...
+    def export_changes(self, dest_path: str, since_seq: int = 0) -> int: ...
+    def import_changes(self, src_path: str) -> int: ...
@@ -1,7 +1,24 @@
+import gzip
+import json
 import sqlite3
+import uuid
 from typing import List, Tuple, Optional
 from core.ports import IRepository
 
+# Формат на changeset файловете (gzip + JSON) за офлайн синхронизация между таблети.
+CHANGESET_FORMAT = 1
+
+def _new_uid() -> str:
+    return uuid.uuid4().hex
+
+def _checked_row(kind: str, row, n_fields: int):
+    # Ред без валиден uid не може да се дедупликира – по-добре целият файл да се откаже.
+    if not isinstance(row, list) or len(row) != n_fields:
+        raise ValueError(f"Невалиден ред в changeset ({kind}): {row!r}")
+    if not isinstance(row[0], str) or not row[0]:
+        raise ValueError(f"Ред без uid в changeset ({kind}): {row!r}")
+    return row
+
 class SQLiteRepo(IRepository):
     def __init__(self, db_path: str = "infra/veresia.db"):
         self.db_path = db_path
@@ -14,26 +31,55 @@ class SQLiteRepo(IRepository):
             cur = con.cursor()
             cur.execute("""CREATE TABLE IF NOT EXISTS pages(
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                path TEXT, ts TEXT
+                path TEXT, ts TEXT, uid TEXT
             )""")
             cur.execute("""CREATE TABLE IF NOT EXISTS entries(
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT, amount_st INTEGER, ts TEXT, page_id INTEGER
+                name TEXT, amount_st INTEGER, ts TEXT, page_id INTEGER, uid TEXT
+            )""")
+            # Append-only дневник: всеки нов ред (локален или внесен) получава пореден seq.
+            cur.execute("""CREATE TABLE IF NOT EXISTS changelog(
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                tbl TEXT NOT NULL, uid TEXT NOT NULL,
+                UNIQUE(tbl, uid)
             )""")
+            self._migrate_uids(cur)
+            cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_pages_uid ON pages(uid)")
+            cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_entries_uid ON entries(uid)")
             con.commit()
 
+    def _migrate_uids(self, cur) -> None:
+        # Стари бази нямат uid – добавяме колоната и даваме стабилни ID-та на съществуващите редове.
+        for tbl in ("pages", "entries"):
+            cols = {r[1] for r in cur.execute(f"PRAGMA table_info({tbl})")}
+            if "uid" not in cols:
+                cur.execute(f"ALTER TABLE {tbl} ADD COLUMN uid TEXT")
+            ids = [r[0] for r in cur.execute(f"SELECT id FROM {tbl} WHERE uid IS NULL ORDER BY id")]
+            for row_id in ids:
+                uid = _new_uid()
+                cur.execute(f"UPDATE {tbl} SET uid = ? WHERE id = ?", (uid, row_id))
+                self._log(cur, tbl, uid)
+
+    def _log(self, cur, tbl: str, uid: str) -> None:
+        cur.execute("INSERT OR IGNORE INTO changelog(tbl, uid) VALUES(?, ?)", (tbl, uid))
+
     def add_page(self, path: str, ts: str) -> int:
         with self._conn() as con:
             cur = con.cursor()
-            cur.execute("INSERT INTO pages(path, ts) VALUES(?, ?)", (path, ts))
+            uid = _new_uid()
+            cur.execute("INSERT INTO pages(path, ts, uid) VALUES(?, ?, ?)", (path, ts, uid))
+            page_id = cur.lastrowid
+            self._log(cur, "pages", uid)
             con.commit()
-            return cur.lastrowid
+            return page_id
 
     def add_entry(self, name: str, amount_st: int, ts: str, page_id: Optional[int]) -> None:
         with self._conn() as con:
             cur = con.cursor()
-            cur.execute("INSERT INTO entries(name, amount_st, ts, page_id) VALUES(?,?,?,?)",
-                        (name, amount_st, ts, page_id))
+            uid = _new_uid()
+            cur.execute("INSERT INTO entries(name, amount_st, ts, page_id, uid) VALUES(?,?,?,?,?)",
+                        (name, amount_st, ts, page_id, uid))
+            self._log(cur, "entries", uid)
             con.commit()
 
     # Агрегирана справка (оставяме я – може да е полезна)
@@ -65,3 +111,83 @@ class SQLiteRepo(IRepository):
             cur.execute("SELECT SUM(amount_st) FROM entries WHERE name = ?", (name,))
             val = cur.fetchone()[0]
             return int(val or 0)
+
+    # -------------------- Офлайн синхронизация (USB / SD карта) --------------------
+
+    def export_changes(self, dest_path: str, since_seq: int = 0) -> int:
+        """
+        Записва в dest_path всички редове от дневника със seq > since_seq.
+        Връща последния изнесен seq – подай го като since_seq следващия път,
+        за да изнесеш само новото. Страниците винаги са преди записите им.
+        Внимание: файлът носи само редовете от БД. pages.path е пътят до PNG-то
+        на изпращащия таблет – самите изображения трябва да се копират отделно
+        (същата папка/път), иначе на другия таблет страниците сочат към липсващи файлове.
+        """
+        with self._conn() as con:
+            cur = con.cursor()
+            # Горната граница се чете първа: редове, записани по време на износа,
+            # остават за следващия changeset, вместо да се „прескочат“ от върнатия seq.
+            cur.execute("SELECT COALESCE(MAX(seq), ?) FROM changelog", (since_seq,))
+            last_seq = int(cur.fetchone()[0])
+            cur.execute("""SELECT c.seq, p.uid, p.path, p.ts
+                           FROM changelog c JOIN pages p ON p.uid = c.uid
+                           WHERE c.tbl = 'pages' AND c.seq > ? AND c.seq <= ?
+                           ORDER BY c.seq""", (since_seq, last_seq))
+            pages = cur.fetchall()
+            cur.execute("""SELECT c.seq, e.uid, e.name, e.amount_st, e.ts, p.uid
+                           FROM changelog c JOIN entries e ON e.uid = c.uid
+                           LEFT JOIN pages p ON p.id = e.page_id
+                           WHERE c.tbl = 'entries' AND c.seq > ? AND c.seq <= ?
+                           ORDER BY c.seq""", (since_seq, last_seq))
+            entries = cur.fetchall()
+            # Страница, изнесена в по-ранен changeset, но нужна на нов запис – добавяме я пак
+            # (внасянето е идемпотентно), за да е всеки файл самодостатъчен.
+            known = {r[1] for r in pages}
+            for page_uid in {r[5] for r in entries if r[5] is not None} - known:
+                cur.execute("SELECT 0, uid, path, ts FROM pages WHERE uid = ?", (page_uid,))
+                pages.extend(cur.fetchall())
+
+        payload = {
+            "format": CHANGESET_FORMAT,
+            "pages": [[r[1], r[2], r[3]] for r in pages],
+            "entries": [[r[1], r[2], int(r[3] or 0), r[4], r[5]] for r in entries],
+        }
+        with gzip.open(dest_path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+        return last_seq
+
+    def import_changes(self, src_path: str) -> int:
+        """
+        Внася changeset файл. Идемпотентно: редове с вече познат uid се пропускат,
+        така че повторно внасяне (или файл от друг таблет с наши редове) е безопасно.
+        Внесените редове влизат и в нашия дневник, за да могат да се препредадат.
+        Връща броя на новодобавените записи (entries). Ред с липсващ uid или грешен
+        брой полета прави целия файл невалиден (ValueError, нищо не се записва).
+        pages.path се внася както е – PNG файловете не са в changeset-а (виж export_changes).
+        """
+        with gzip.open(src_path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        if payload.get("format") != CHANGESET_FORMAT:
+            raise ValueError(f"Непознат формат на changeset: {payload.get('format')!r}")
+
+        added = 0
+        with self._conn() as con:
+            cur = con.cursor()
+            for row in payload.get("pages", []):
+                uid, path, ts = _checked_row("pages", row, 3)
+                cur.execute("INSERT OR IGNORE INTO pages(path, ts, uid) VALUES(?, ?, ?)", (path, ts, uid))
+                if cur.rowcount:
+                    self._log(cur, "pages", uid)
+            for row in payload.get("entries", []):
+                uid, name, amount_st, ts, page_uid = _checked_row("entries", row, 5)
+                page_id = None
+                if page_uid is not None:
+                    row = cur.execute("SELECT id FROM pages WHERE uid = ?", (page_uid,)).fetchone()
+                    page_id = row[0] if row else None
+                cur.execute("INSERT OR IGNORE INTO entries(name, amount_st, ts, page_id, uid) VALUES(?,?,?,?,?)",
+                            (name, amount_st, ts, page_id, uid))
+                if cur.rowcount:
+                    self._log(cur, "entries", uid)
+                    added += 1
+            con.commit()
+        return added
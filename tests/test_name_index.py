@@ -0,0 +1,84 @@
+# Префиксен индекс за подсказки на имена (core.name_index).
+from core.name_index import NamePrefixIndex, SUGGEST_LIMIT
+
+
+class _Source:
+    """Фалшиво хранилище: връща готова снимка; по желание пише „по време“ на четенето."""
+    def __init__(self, max_id, sums, during=None):
+        self.max_id, self.sums, self.during = max_id, sums, during
+
+    def name_balances(self):
+        if self.during:
+            self.during()
+        return self.max_id, list(self.sums)
+
+
+class _Broken:
+    def name_balances(self):
+        raise RuntimeError("database is locked")
+
+
+def _loaded(sums, max_id=100):
+    ix = NamePrefixIndex()
+    assert ix.load(_Source(max_id, sums))
+    return ix
+
+
+def test_prefix_hits_sorted_and_case_insensitive():
+    ix = _loaded([("Мария", 10), ("Иванка", 50), ("иван Петров", 100), ("Петър", 5)])
+    assert ix.suggest("ИВ") == [("иван Петров", 100), ("Иванка", 50)]
+    assert ix.suggest("мар") == [("Мария", 10)]
+    assert ix.suggest("x") == []
+    assert ix.suggest("   ") == []
+
+
+def test_trailing_space_is_part_of_prefix():
+    ix = _loaded([("Иванка", 50), ("Иван Петров", 100)])
+    assert ix.suggest("Иван ") == [("Иван Петров", 100)]
+    assert ix.suggest("  Иван") == [("Иван Петров", 100), ("Иванка", 50)]
+
+
+def test_limit_caps_results():
+    ix = _loaded([(f"Име{i:02d}", i) for i in range(20)])
+    assert len(ix.suggest("име")) == SUGGEST_LIMIT
+    assert ix.suggest("име", limit=3) == [("Име00", 0), ("Име01", 1), ("Име02", 2)]
+
+
+def test_add_after_load_inserts_new_names_in_order():
+    ix = _loaded([("Борис", 10), ("Десислава", 20)], max_id=2)
+    ix.add(3, "Боряна", 7)
+    ix.add(4, "Борис", 5)
+    assert ix.suggest("бор") == [("Борис", 15), ("Боряна", 7)]
+
+
+def test_row_in_snapshot_is_counted_once():
+    # записът е комитнат преди снимката, а add() пристига след load()
+    ix = _loaded([("Иван", 100)], max_id=1)
+    ix.add(1, "Иван", 100)
+    assert ix.suggest("иван") == [("Иван", 100)]
+
+
+def test_writes_during_load_are_applied():
+    ix = NamePrefixIndex()
+
+    def concurrent_writes():
+        ix.add(1, "Иван", 100)   # вече влиза в снимката
+        ix.add(2, "Иван", 5)     # след снимката
+        ix.add(3, "Зоя", 7)
+
+    assert ix.load(_Source(1, [("Иван", 100)], during=concurrent_writes))
+    assert ix.ready
+    assert ix.suggest("иван") == [("Иван", 105)]
+    assert ix.suggest("зо") == [("Зоя", 7)]
+
+
+def test_failed_load_resets_state():
+    ix = NamePrefixIndex()
+    assert not ix.load(_Broken())
+    assert not ix.ready
+    ix.add(1, "Иван", 5)
+    assert ix._pending == []
+
+    # повторен опит след грешка работи нормално
+    assert ix.load(_Source(1, [("Иван", 5)]))
+    assert ix.ready and ix.suggest("ив") == [("Иван", 5)]
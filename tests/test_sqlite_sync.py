@@ -0,0 +1,105 @@
+# Офлайн синхронизация между два SQLite файла (export_changes / import_changes).
+import gzip
+import json
+import sqlite3
+
+import pytest
+
+from infra.database_sqlite import SQLiteRepo
+
+
+def _repo(tmp_path, name):
+    repo = SQLiteRepo(str(tmp_path / name))
+    repo.init()
+    return repo
+
+
+def _page_path_of(repo, name):
+    with repo._conn() as con:
+        row = con.execute("""SELECT p.path FROM entries e JOIN pages p ON p.id = e.page_id
+                             WHERE e.name = ?""", (name,)).fetchone()
+    return row[0] if row else None
+
+
+def test_import_twice_adds_nothing(tmp_path):
+    a, b = _repo(tmp_path, "a.db"), _repo(tmp_path, "b.db")
+    page_id = a.add_page("p1.png", "t1")
+    a.add_entry("Мария", 250, "t1", page_id)
+    a.add_entry("Петър", 50, "t1", None)
+    a.export_changes(str(tmp_path / "a.vcs"))
+
+    assert b.import_changes(str(tmp_path / "a.vcs")) == 2
+    assert b.import_changes(str(tmp_path / "a.vcs")) == 0
+    assert sorted(b.search_by_name("")) == [("Мария", 250), ("Петър", 50)]
+
+
+def test_page_ids_are_remapped(tmp_path):
+    a, b = _repo(tmp_path, "a.db"), _repo(tmp_path, "b.db")
+    b.add_page("local.png", "t0")  # заема id=1 в b
+    page_id = a.add_page("p1.png", "t1")
+    a.add_entry("Мария", 250, "t1", page_id)
+    a.export_changes(str(tmp_path / "a.vcs"))
+
+    b.import_changes(str(tmp_path / "a.vcs"))
+    assert b.list_entries("Мария")[0][2] != page_id
+    assert _page_path_of(b, "Мария") == "p1.png"
+
+
+def test_incremental_export_is_self_contained(tmp_path):
+    a, b, c = _repo(tmp_path, "a.db"), _repo(tmp_path, "b.db"), _repo(tmp_path, "c.db")
+    page_id = a.add_page("p1.png", "t1")
+    a.add_entry("Мария", 250, "t1", page_id)
+    seq = a.export_changes(str(tmp_path / "a1.vcs"))
+    b.import_changes(str(tmp_path / "a1.vcs"))
+
+    a.add_entry("Мария", 30, "t2", page_id)
+    assert a.export_changes(str(tmp_path / "a2.vcs"), seq) > seq
+
+    # b вече има страницата, c – не; и двете трябва да вържат записа към нея
+    assert b.import_changes(str(tmp_path / "a2.vcs")) == 1
+    assert c.import_changes(str(tmp_path / "a2.vcs")) == 1
+    assert b.sum_for_name("Мария") == 280
+    assert _page_path_of(c, "Мария") == "p1.png"
+
+
+def test_old_schema_gets_uids_and_syncs(tmp_path):
+    db = tmp_path / "old.db"
+    con = sqlite3.connect(str(db))
+    con.execute("CREATE TABLE pages(id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT, ts TEXT)")
+    con.execute("""CREATE TABLE entries(id INTEGER PRIMARY KEY AUTOINCREMENT,
+                   name TEXT, amount_st INTEGER, ts TEXT, page_id INTEGER)""")
+    con.execute("INSERT INTO pages(path, ts) VALUES('old.png', 't0')")
+    con.execute("INSERT INTO entries(name, amount_st, ts, page_id) VALUES('Иван', 100, 't0', 1)")
+    con.commit()
+    con.close()
+
+    old = SQLiteRepo(str(db))
+    old.init()
+    old.init()
+    with old._conn() as con:
+        assert con.execute("SELECT COUNT(*) FROM entries WHERE uid IS NULL").fetchone()[0] == 0
+        assert con.execute("SELECT COUNT(*) FROM changelog").fetchone()[0] == 2
+
+    a = _repo(tmp_path, "a.db")
+    old.export_changes(str(tmp_path / "old.vcs"))
+    assert a.import_changes(str(tmp_path / "old.vcs")) == 1
+    assert _page_path_of(a, "Иван") == "old.png"
+
+
+def test_rows_without_uid_are_rejected(tmp_path):
+    a, b = _repo(tmp_path, "a.db"), _repo(tmp_path, "b.db")
+    a.add_entry("Мария", 250, "t1", None)
+    a.export_changes(str(tmp_path / "a.vcs"))
+    with gzip.open(str(tmp_path / "a.vcs"), "rt", encoding="utf-8") as f:
+        payload = json.load(f)
+
+    for bad in ([None, "X", 5, "t", None], ["", "X", 5, "t", None], ["u1", "X", 5]):
+        payload["entries"].append(bad)
+        with gzip.open(str(tmp_path / "bad.vcs"), "wt", encoding="utf-8") as f:
+            json.dump(payload, f)
+        with pytest.raises(ValueError):
+            b.import_changes(str(tmp_path / "bad.vcs"))
+        payload["entries"].pop()
+
+    # валидните редове от същия файл също не са записани
+    assert b.search_by_name("") == []
@@ -6,10 +6,12 @@ from __future__ import annotations
 
 import io
 import os
+import sys
 import re
 import math
 import time
 import sqlite3
+import threading
 from dataclasses import dataclass
 from typing import List, Optional, Tuple
 
@@ -25,6 +27,10 @@ from kivy.graphics import Color, Line, Rectangle
 from kivy.core.image import Image as CoreImage
 from kivy.clock import Clock
 
+# корена на проекта в sys.path – за да работи и `python ui_kivy/app.py`
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from core.name_index import NamePrefixIndex, SUGGEST_LIMIT
+
 # -------------------------- Пътища / инициализация --------------------------
 
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -36,6 +42,8 @@ os.makedirs(PAGES_DIR, exist_ok=True)
 DB_PATH = os.path.join(DATA_DIR, "veresia.db")
 os.makedirs(DATA_DIR, exist_ok=True)
 
+SUGGEST_DEBOUNCE_S = 0.15   # пауза след последния клавиш преди подсказките
+
 # -------------------------- Данни / БД --------------------------------------
 
 @dataclass
@@ -46,10 +54,14 @@ class EntryRow:
     ts_iso: str
     page_path: str
 
+# Общ индекс за всички екрани (всеки екран има собствен Repository).
+NAME_INDEX = NamePrefixIndex()
+
 class Repository:
     """Малък слой над SQLite. Таблица entries(name TEXT, amount_st INT, ts_iso TEXT, page_path TEXT)."""
-    def __init__(self, db_path: str = DB_PATH):
+    def __init__(self, db_path: str = DB_PATH, index: Optional[NamePrefixIndex] = NAME_INDEX):
         self.db_path = db_path
+        self.index = index
         self._ensure_schema()
 
     def _conn(self):
@@ -74,14 +86,34 @@ class Repository:
                 "INSERT INTO entries(name, amount_st, ts_iso, page_path) VALUES(?,?,?,?)",
                 (name, amount_st, ts_iso, page_path)
             )
-            return cur.lastrowid
+            row_id = cur.lastrowid
+        if self.index is not None:
+            self.index.add(row_id, name, amount_st)
+        return row_id
 
     def add_entries_bulk(self, items: List[Tuple[str, int, str, str]]):
+        # ред по ред в една транзакция – трябват ни id-тата за индекса
+        added = []
         with self._conn() as c:
-            c.executemany(
-                "INSERT INTO entries(name, amount_st, ts_iso, page_path) VALUES(?,?,?,?)",
-                items
+            for item in items:
+                cur = c.execute(
+                    "INSERT INTO entries(name, amount_st, ts_iso, page_path) VALUES(?,?,?,?)",
+                    item
+                )
+                added.append((cur.lastrowid, item[0], item[1]))
+        if self.index is not None:
+            for row_id, name, amount_st in added:
+                self.index.add(row_id, name, amount_st)
+
+    def name_balances(self) -> Tuple[int, List[Tuple[str, int]]]:
+        """Връща (max_id, [(име, сума_стотинки), ...]) от една и съща снимка на БД."""
+        with self._conn() as c:
+            max_id = c.execute("SELECT COALESCE(MAX(id), 0) FROM entries").fetchone()[0]
+            cur = c.execute(
+                "SELECT name, SUM(amount_st) FROM entries WHERE id <= ? GROUP BY name",
+                (max_id,)
             )
+            return int(max_id), [(r[0], int(r[1] or 0)) for r in cur.fetchall()]
 
     def search_by_name(self, q: str) -> Tuple[List[EntryRow], int]:
         """Връща (списък, общо_стотинки)."""
@@ -433,6 +465,9 @@ class SearchScreen(Screen):
 
         self.input = TextInput(hint_text="Име…", multiline=False, write_tab=False, size_hint_x=0.6)
         self.input.bind(on_text_validate=lambda *_: self.do_search())
+        # подсказки докато пишем – debounce, за да не преизчисляваме на всеки клавиш
+        self._suggest_trigger = Clock.create_trigger(lambda *_: self.update_suggestions(), SUGGEST_DEBOUNCE_S)
+        self.input.bind(text=lambda *_: self._suggest_trigger())
         header.add_widget(self.input)
 
         btn_search = Button(text="Търси", size_hint_x=None, width=120)
@@ -445,6 +480,10 @@ class SearchScreen(Screen):
 
         root.add_widget(header)
 
+        # Подсказки (име + текущ баланс) от in-memory индекса
+        self.suggestions = BoxLayout(orientation="horizontal", size_hint_y=None, height=0, padding=(8, 0), spacing=6)
+        root.add_widget(self.suggestions)
+
         # Резултати
         self.lbl = Label(text="Резултати ще се покажат тук…", halign="left", valign="top")
         self.lbl.bind(size=lambda *_: setattr(self.lbl, "text_size", self.lbl.size))
@@ -452,6 +491,27 @@ class SearchScreen(Screen):
 
         self.add_widget(root)
 
+    def update_suggestions(self):
+        self.suggestions.clear_widgets()
+        index = self.repo.index
+        # докато фоновото зареждане не е свършило, балансите са непълни – не показваме нищо
+        hits = index.suggest(self.input.text, limit=SUGGEST_LIMIT) if index and index.ready else []
+        # точно съвпадение с единствената подсказка – няма какво да предлагаме
+        if len(hits) == 1 and hits[0][0] == self.input.text.strip():
+            hits = []
+        for name, balance_st in hits:
+            btn = Button(text=f"{name}  ({(balance_st/100):.2f} лв)")
+            btn.bind(on_release=lambda _btn, n=name: self.pick_suggestion(n))
+            self.suggestions.add_widget(btn)
+        self.suggestions.height = 44 if hits else 0
+
+    def pick_suggestion(self, name: str):
+        self.input.text = name
+        self._suggest_trigger.cancel()
+        self.suggestions.clear_widgets()
+        self.suggestions.height = 0
+        self.do_search()
+
     def do_search(self):
         self.query = self.input.text.strip()
         if not self.query:
@@ -488,5 +548,14 @@ class VeresiaApp(App):
         sm.current = "write"
         return sm
 
+    def on_start(self):
+        # индексът за подсказки се пълни във фонов режим, за да не бави старта
+        threading.Thread(target=self._load_name_index, daemon=True).start()
+
+    def _load_name_index(self):
+        if NAME_INDEX.load(Repository()):
+            # ако вече е писано в полето, докато сме зареждали – показваме подсказките веднага
+            Clock.schedule_once(lambda *_: self.root.get_screen("search").update_suggestions())
+
 if __name__ == "__main__":
     VeresiaApp().run()